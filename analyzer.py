@@ -22,12 +22,11 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 
-import numpy as np
-import librosa
 from logger import LOGGER as log
 from environment import CLFFG as gender_model
 from environment import CLFFA as age_model
 from environment import CLFFD as dialect_model
+from features import stream_features
 
 
 def voice_analyzer(filename):
@@ -36,17 +35,8 @@ def voice_analyzer(filename):
     See: https://github.com/lreynolds18/Voice-Analyzer
     """
     meta = {}
-    y, sr = librosa.load(filename, sr=22050)
 
-    stft = np.abs(librosa.stft(y))
-    mfccs = np.mean(librosa.feature.mfcc(y=y, sr=sr, n_mfcc=40).T, axis=0)
-    mel = np.mean(librosa.feature.melspectrogram(y, sr=sr).T, axis=0)
-    contrast = np.mean(librosa.feature.spectral_contrast(S=stft, sr=sr).T, axis=0)
-    tonnetz = np.mean(librosa.feature.tonnetz(y=librosa.effects.harmonic(y), sr=sr).T, axis=0)
-    chroma = np.mean(librosa.feature.chroma_stft(S=stft, sr=sr).T, axis=0)
-
-    features = np.hstack([mfccs, chroma, mel, contrast, tonnetz])
-    features = features.reshape(1, -1)
+    features = stream_features(filename).reshape(1, -1)
 
     meta['gender'] = gender_model.predict(features)[0]
     meta['age'] = age_model.predict(features)[0]
@@ -0,0 +1,118 @@
+"""
+MIT License
+
+Copyright (c) 2018 Michael Schmidt
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import os
+import sys
+import time
+import wave
+import tempfile
+import tracemalloc
+import contextlib
+
+import numpy as np
+
+from features import SAMPLE_RATE, extract_features, stream_features
+
+
+def synthesize(filename, seconds, sr=SAMPLE_RATE):
+    """
+    Write a voice-like test recording: a gliding harmonic tone, syllable-rate
+    amplitude modulation, a little noise and some silence.
+
+    :filename:      str()           Where to write the WAV file
+    :seconds:       float()         Duration in seconds
+    :sr:            int()           Sample rate
+    :returns:       None
+    """
+
+    rng = np.random.RandomState(0)
+    chunk = 10 * sr
+
+    with contextlib.closing(wave.open(filename, 'w')) as data:
+        data.setnchannels(1)
+        data.setsampwidth(2)
+        data.setframerate(sr)
+
+        for start in range(0, int(seconds * sr), chunk):
+            t = (start + np.arange(min(chunk, int(seconds * sr) - start))) / float(sr)
+            f0 = 150 + 30 * np.sin(2 * np.pi * 0.2 * t)
+            phase = 2 * np.pi * np.cumsum(f0) / sr
+            y = sum(np.sin(k * phase) / k for k in range(1, 8))
+            y *= np.maximum(np.sin(2 * np.pi * 2 * t), 0) * (np.sin(2 * np.pi * 0.05 * t) > -0.8)
+            y += 0.01 * rng.randn(len(t))
+            data.writeframes((0.3 * y * 32767).astype('<i2').tobytes())
+
+
+def measure(function, filename):
+    """
+    Run a feature extractor and record its peak traced memory.
+
+    :function:      callable        extract_features or stream_features
+    :filename:      str()           A WAV file
+    :returns:       tuple()         (features, peak bytes, seconds)
+    """
+
+    tracemalloc.start()
+    begin = time.time()
+    features = function(filename)
+    elapsed = time.time() - begin
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return features, peak, elapsed
+
+
+def main(minutes):
+    """
+    Compare the in-memory and streaming extractors on recordings of
+    increasing length.
+
+    :minutes:       list()          Recording lengths, in minutes
+    :returns:       None
+    """
+
+    row = '{:>8} {:>12} {:>12} {:>10} {:>10} {:>10}'
+    print(row.format('minutes', 'memory MiB', 'stream MiB', 'memory s', 'stream s', 'max diff'))
+
+    for length in minutes:
+        handle, filename = tempfile.mkstemp(suffix='.wav')
+        os.close(handle)
+
+        try:
+            synthesize(filename, length * 60)
+            expected, memory_peak, memory_time = measure(extract_features, filename)
+            actual, stream_peak, stream_time = measure(stream_features, filename)
+        finally:
+            os.remove(filename)
+
+        print(row.format(length,
+                         '{:.1f}'.format(memory_peak / 2.**20),
+                         '{:.1f}'.format(stream_peak / 2.**20),
+                         '{:.1f}'.format(memory_time),
+                         '{:.1f}'.format(stream_time),
+                         '{:.2e}'.format(np.max(np.abs(expected - actual)))))
+
+
+if __name__ == '__main__':
+    main([float(arg) for arg in sys.argv[1:]] or [1, 5, 15])
@@ -0,0 +1,448 @@
+"""
+MIT License
+
+Copyright (c) 2018 Michael Schmidt
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import os
+from math import gcd
+
+import numpy as np
+import librosa
+import audioread
+
+SAMPLE_RATE = 22050
+HOP_LENGTH = 512
+N_MFCC = 40
+
+# frames of new output per block (~47s), and frames of overlap on either side.
+# The overlap covers the HPSS median filter, the inverse STFT and the longest
+# (lowest octave) CQT filter plus its resampling, so interior frames of a block
+# see exactly the samples they would see in the whole recording.
+BLOCK_FRAMES = 2048
+CONTEXT_FRAMES = 96
+
+# input samples of overlap kept around each resampled chunk, and chunk length
+RESAMPLE_MARGIN = 1024
+RESAMPLE_SECONDS = 10
+
+# log10 magnitude bins used to locate the median peak for tuning estimation
+MAG_LOG_BINS = np.arange(-10.0, 5.0, 0.005)
+
+TOP_DB = 80.0
+
+
+def extract_features(filename):
+    """
+    In-memory feature extraction: loads the whole recording at once.
+    Kept as the reference for stream_features().
+
+    :filename:      str()           A filename (relative to __main__)
+    :returns:       np.ndarray      193 features (mfcc, chroma, mel, contrast, tonnetz)
+    """
+
+    y, sr = librosa.load(filename, sr=SAMPLE_RATE)
+
+    stft = np.abs(librosa.stft(y))
+    mfccs = np.mean(librosa.feature.mfcc(y=y, sr=sr, n_mfcc=N_MFCC).T, axis=0)
+    mel = np.mean(librosa.feature.melspectrogram(y, sr=sr).T, axis=0)
+    contrast = np.mean(librosa.feature.spectral_contrast(S=stft, sr=sr).T, axis=0)
+    tonnetz = np.mean(librosa.feature.tonnetz(y=librosa.effects.harmonic(y), sr=sr).T, axis=0)
+    chroma = np.mean(librosa.feature.chroma_stft(S=stft, sr=sr).T, axis=0)
+
+    return np.hstack([mfccs, chroma, mel, contrast, tonnetz])
+
+
+def stream_features(filename, block_frames=BLOCK_FRAMES):
+    """
+    Block-streaming equivalent of extract_features().  Memory stays flat
+    apart from the small tuning buffer described in _TuningHistogram.
+
+    Every feature is a mean over frames, so blocks are reduced to running sums.
+    The few statistics librosa takes over the whole recording (the 80 dB floor
+    of power_to_db and the tuning estimates) are gathered in two first passes.
+
+    :filename:      str()           A filename (relative to __main__)
+    :block_frames:  int()           STFT frames processed per block
+    :returns:       np.ndarray      193 features (mfcc, chroma, mel, contrast, tonnetz)
+    """
+
+    stats = _global_stats(filename, block_frames)
+
+    mel_floor = librosa.power_to_db(stats['mel_peak'], top_db=None) - TOP_DB
+    peak_floor = librosa.power_to_db(stats['contrast_peak'], top_db=None) - TOP_DB
+    valley_floor = librosa.power_to_db(stats['contrast_valley'], top_db=None) - TOP_DB
+
+    sums = {'log_mel': 0., 'mel': 0., 'contrast': 0., 'chroma': 0., 'tonnetz': 0.}
+    n_frames = n_cqt_frames = 0
+
+    for y, lo, hi in _segments(filename, block_frames):
+        stft = np.abs(librosa.stft(y))[:, lo:hi]
+
+        mel = librosa.feature.melspectrogram(S=stft**2, sr=SAMPLE_RATE)
+        log_mel = np.maximum(librosa.power_to_db(mel, top_db=None), mel_floor)
+        sums['mel'] += mel.sum(axis=1, dtype=np.float64)
+        sums['log_mel'] += log_mel.sum(axis=1, dtype=np.float64)
+
+        peak, valley = _contrast_bands(stft, SAMPLE_RATE)
+        contrast = (np.maximum(librosa.power_to_db(peak, top_db=None), peak_floor) -
+                    np.maximum(librosa.power_to_db(valley, top_db=None), valley_floor))
+        sums['contrast'] += contrast.sum(axis=1, dtype=np.float64)
+
+        chroma = librosa.feature.chroma_stft(S=stft, sr=SAMPLE_RATE, tuning=stats['stft_tuning'])
+        sums['chroma'] += chroma.sum(axis=1, dtype=np.float64)
+
+        cqt = librosa.feature.chroma_cqt(y=librosa.effects.harmonic(y), sr=SAMPLE_RATE,
+                                         tuning=stats['harmonic_tuning'])[:, lo:hi]
+        tonnetz = librosa.feature.tonnetz(chroma=cqt)
+        sums['tonnetz'] += tonnetz.sum(axis=1, dtype=np.float64)
+
+        n_frames += stft.shape[1]
+        n_cqt_frames += cqt.shape[1]
+
+    if not n_frames:
+        raise ValueError('No audio frames in {}'.format(filename))
+
+    log_mel = sums['log_mel'] / n_frames
+    mfccs = librosa.feature.mfcc(S=log_mel[:, np.newaxis], n_mfcc=N_MFCC)[:, 0]
+
+    return np.hstack([mfccs,
+                      sums['chroma'] / n_frames,
+                      sums['mel'] / n_frames,
+                      sums['contrast'] / n_frames,
+                      sums['tonnetz'] / n_cqt_frames])
+
+
+def _global_stats(filename, block_frames):
+    """
+    First passes of stream_features(): whole-recording statistics.
+
+    :filename:      str()           A filename (relative to __main__)
+    :block_frames:  int()           STFT frames processed per block
+    :returns:       dict()          peaks for the dB floors, tuning estimates
+    """
+
+    stats = {'mel_peak': 0., 'contrast_peak': 0., 'contrast_valley': 0.}
+    stft_tuning = _TuningHistogram()
+    harmonic_tuning = _TuningHistogram()
+
+    for y, lo, hi in _segments(filename, block_frames):
+        stft = np.abs(librosa.stft(y))[:, lo:hi]
+
+        mel = librosa.feature.melspectrogram(S=stft**2, sr=SAMPLE_RATE)
+        stats['mel_peak'] = max(stats['mel_peak'], mel.max())
+
+        peak, valley = _contrast_bands(stft, SAMPLE_RATE)
+        stats['contrast_peak'] = max(stats['contrast_peak'], peak.max())
+        stats['contrast_valley'] = max(stats['contrast_valley'], valley.max())
+
+        stft_tuning.add(*librosa.piptrack(S=stft, sr=SAMPLE_RATE))
+
+        harmonic = np.abs(librosa.stft(librosa.effects.harmonic(y)))[:, lo:hi]
+        harmonic_tuning.add(*librosa.piptrack(S=harmonic, sr=SAMPLE_RATE))
+
+    # tuning-only pass for the exact median magnitude of each estimate.
+    # Like the other passes it decodes, resamples and runs the STFT and
+    # librosa.effects.harmonic() again: three passes in all, roughly 2.7x the
+    # run time of extract_features(), traded for flat memory.
+    for y, lo, hi in _segments(filename, block_frames):
+        stft = np.abs(librosa.stft(y))[:, lo:hi]
+        stft_tuning.refine(*librosa.piptrack(S=stft, sr=SAMPLE_RATE))
+
+        harmonic = np.abs(librosa.stft(librosa.effects.harmonic(y)))[:, lo:hi]
+        harmonic_tuning.refine(*librosa.piptrack(S=harmonic, sr=SAMPLE_RATE))
+
+    stats['stft_tuning'] = stft_tuning.estimate()
+    stats['harmonic_tuning'] = harmonic_tuning.estimate()
+
+    return stats
+
+
+class _TuningHistogram():
+    """
+    Reproduces librosa.estimate_tuning() over blocks.  The histograms are a
+    fixed size; the pitches kept from the median bins (about 1% of all
+    pitches) are small but grow with the duration of the recording.
+
+    estimate_tuning() keeps the pitches whose magnitude is at least the median
+    magnitude and returns the most common residual of pitch_tuning().  The
+    first pass counts residuals per MAG_LOG_BINS bin of magnitude, which
+    locates the median to one bin (two when it averages across a boundary).
+    A second pass keeps only the pitches in those bins, from which the exact
+    median and the residual counts at or above it are recovered.
+    """
+
+    def __init__(self, resolution=0.01, bins_per_octave=12):
+        """
+        :resolution:        float()     Resolution of the tuning as a fraction of a bin
+        :bins_per_octave:   int()       Number of frequency bins per octave
+        """
+
+        self.bins_per_octave = bins_per_octave
+        self.tuning = np.linspace(-0.5, 0.5, int(np.ceil(1. / resolution)), endpoint=False)
+        self.magnitudes = np.zeros(len(MAG_LOG_BINS) - 1, dtype=np.int64)
+        self.counts = np.zeros((len(MAG_LOG_BINS) - 1, len(self.tuning) - 1))
+        self.median = None
+        self.kept = []
+
+    def _pitches(self, pitches, magnitudes):
+        """
+        Residuals, magnitudes and magnitude bins of the detected pitches,
+        computed as librosa.pitch_tuning() does.
+
+        :pitches:       np.ndarray      Instantaneous frequencies
+        :magnitudes:    np.ndarray      Magnitudes of the pitches
+        :returns:       tuple()         (residual, magnitude, bin) arrays
+        """
+
+        mask = pitches > 0
+
+        residual = np.mod(self.bins_per_octave * librosa.hz_to_octs(pitches[mask]), 1.0)
+        residual[residual >= 0.5] -= 1.0
+
+        mag = magnitudes[mask]
+        log_mag = np.log10(np.maximum(mag, np.finfo(np.float32).tiny))
+        bins = np.searchsorted(MAG_LOG_BINS, log_mag, side='right') - 1
+        bins = np.clip(bins, 0, len(self.magnitudes) - 1)
+
+        return residual, mag, bins
+
+    def add(self, pitches, magnitudes):
+        """
+        First pass: add one block of librosa.piptrack() output.
+
+        :pitches:       np.ndarray      Instantaneous frequencies
+        :magnitudes:    np.ndarray      Magnitudes of the pitches
+        :returns:       None
+        """
+
+        residual, _, bins = self._pitches(pitches, magnitudes)
+
+        self.magnitudes += np.bincount(bins, minlength=len(self.magnitudes))
+        self.counts += np.histogram2d(bins, residual,
+                                      [np.arange(len(self.magnitudes) + 1), self.tuning])[0]
+
+    def refine(self, pitches, magnitudes):
+        """
+        Second pass: keep the pitches from the bins holding the median.
+        Blocks must be the same, in the same order, as in add().
+
+        :pitches:       np.ndarray      Instantaneous frequencies
+        :magnitudes:    np.ndarray      Magnitudes of the pitches
+        :returns:       None
+        """
+
+        if self.median is None:
+            total = self.magnitudes.sum()
+            if not total:
+                return
+
+            # np.median takes the middle one or two sorted values
+            cumulative = np.cumsum(self.magnitudes)
+            middle = ((total - 1) // 2, total // 2)
+            first, last = np.searchsorted(cumulative, middle, side='right')
+            self.median = (first, last, cumulative[first] - self.magnitudes[first], middle)
+
+        first, last = self.median[:2]
+        residual, mag, bins = self._pitches(pitches, magnitudes)
+        keep = (bins >= first) & (bins <= last)
+
+        self.kept.append((residual[keep], mag[keep]))
+
+    def estimate(self):
+        """
+        :returns:       float()         Estimated tuning deviation (fractions of a bin)
+        """
+
+        if self.median is None:
+            return 0.0
+
+        first, last, below, middle = self.median
+
+        residual = np.concatenate([pair[0] for pair in self.kept])
+        mag = np.concatenate([pair[1] for pair in self.kept])
+
+        ordered = np.sort(mag)
+        threshold = np.median(ordered[middle[0] - below:middle[1] - below + 1])
+
+        counts = self.counts[last + 1:].sum(axis=0)
+        counts += np.histogram(residual[mag >= threshold], self.tuning)[0]
+
+        return self.tuning[np.argmax(counts)]
+
+
+def _contrast_bands(stft, sr, fmin=200.0, n_bands=6, quantile=0.02):
+    """
+    Octave band peaks and valleys, as in librosa.feature.spectral_contrast()
+    before it converts them with power_to_db() (and its whole-recording floor).
+
+    :stft:          np.ndarray      Magnitude spectrogram
+    :sr:            int()           Sample rate
+    :returns:       tuple()         (peak, valley), each (n_bands + 1, frames)
+    """
+
+    freq = librosa.fft_frequencies(sr=sr, n_fft=2 * (stft.shape[0] - 1))
+
+    octa = np.zeros(n_bands + 2)
+    octa[1:] = fmin * (2.0**np.arange(0, n_bands + 1))
+
+    valley = np.zeros((n_bands + 1, stft.shape[1]))
+    peak = np.zeros_like(valley)
+
+    for k, (f_low, f_high) in enumerate(zip(octa[:-1], octa[1:])):
+        current_band = np.logical_and(freq >= f_low, freq <= f_high)
+
+        idx = np.flatnonzero(current_band)
+
+        if k > 0:
+            current_band[idx[0] - 1] = True
+
+        if k == n_bands:
+            current_band[idx[-1] + 1:] = True
+
+        sub_band = stft[current_band]
+
+        if k < n_bands:
+            sub_band = sub_band[:-1]
+
+        # Always take at least one bin from each side
+        idx = int(np.maximum(np.rint(quantile * np.sum(current_band)), 1))
+
+        sortedr = np.sort(sub_band, axis=0)
+
+        valley[k] = np.mean(sortedr[:idx], axis=0)
+        peak[k] = np.mean(sortedr[-idx:], axis=0)
+
+    return peak, valley
+
+
+def _segments(filename, block_frames, context_frames=CONTEXT_FRAMES):
+    """
+    Read a recording as overlapping blocks of SAMPLE_RATE audio.
+
+    :filename:          str()           A filename (relative to __main__)
+    :block_frames:      int()           STFT frames owned by each block
+    :context_frames:    int()           Frames of overlap on either side
+    :returns:           generator       (samples, lo, hi): frames lo:hi of the
+                                        block's STFT belong to this block
+    """
+
+    block = block_frames * HOP_LENGTH
+    context = context_frames * HOP_LENGTH
+
+    with audioread.audio_open(os.path.realpath(filename)) as source:
+        samples = _resample(_decode(source), source.samplerate, SAMPLE_RATE)
+
+        for y, start, last in _overlapping(samples, block, context):
+            lo = start // HOP_LENGTH
+            hi = 1 + len(y) // HOP_LENGTH if last else lo + block_frames
+            yield y, lo, hi
+
+
+def _decode(source):
+    """
+    Decode an audioread file to mono float32 the same way librosa.load() does.
+
+    :source:        audioread file  An open audio file
+    :returns:       generator       np.ndarray chunks at the native sample rate
+    """
+
+    carry = np.zeros(0, dtype=np.float32)
+
+    for buf in source:
+        frame = np.concatenate((carry, librosa.util.buf_to_float(buf, dtype=np.float32)))
+        usable = len(frame) - len(frame) % source.channels
+        carry = frame[usable:]
+
+        if not usable:
+            continue
+
+        if source.channels > 1:
+            yield librosa.to_mono(frame[:usable].reshape((-1, source.channels)).T)
+        else:
+            yield frame[:usable]
+
+
+def _resample(chunks, orig_sr, target_sr):
+    """
+    Resample a stream of chunks.  Each chunk is resampled with RESAMPLE_MARGIN
+    samples of overlap, enough for the resampling filter to see all of its
+    support, and starts on an input sample that lands on an output sample.
+
+    :chunks:        iterable        np.ndarray chunks at orig_sr
+    :orig_sr:       int()           Sample rate of the chunks
+    :target_sr:     int()           Sample rate to produce
+    :returns:       generator       np.ndarray chunks at target_sr
+    """
+
+    if orig_sr == target_sr:
+        yield from chunks
+        return
+
+    step = orig_sr // gcd(orig_sr, target_sr)
+    out_step = target_sr // gcd(orig_sr, target_sr)
+
+    margin = RESAMPLE_MARGIN / min(1., float(target_sr) / orig_sr)
+    margin = step * int(np.ceil(margin / step))
+    block = step * int(np.ceil(orig_sr * RESAMPLE_SECONDS / float(step)))
+
+    for y, start, last in _overlapping(chunks, block, margin):
+        y_hat = librosa.resample(y, orig_sr=orig_sr, target_sr=target_sr)
+        lo = start // step * out_step
+
+        if last:
+            yield y_hat[lo:]
+        else:
+            yield y_hat[lo:lo + block // step * out_step]
+
+
+def _overlapping(chunks, block, context):
+    """
+    Re-chunk a stream into windows of `block` new samples, each with up to
+    `context` samples of its neighbours on either side.  The first window
+    starts at the first sample and the last one ends at the last sample.
+
+    :chunks:        iterable        np.ndarray chunks of any size
+    :block:         int()           New samples per window
+    :context:       int()           Overlap on either side
+    :returns:       generator       (window, start, last): window[start:] begins
+                                    with the new samples
+    """
+
+    buff = np.zeros(0, dtype=np.float32)
+    offset = 0
+    start = 0
+
+    for chunk in chunks:
+        buff = np.concatenate((buff, chunk))
+
+        while offset + len(buff) >= start + block + context:
+            lower = max(0, start - context)
+            yield buff[lower - offset:start + block + context - offset], start - lower, False
+
+            start += block
+            drop = max(0, start - context) - offset
+            buff = buff[drop:]
+            offset += drop
+
+    lower = max(0, start - context)
+    if offset + len(buff) > lower:
+        yield buff[lower - offset:], start - lower, True
@@ -0,0 +1,130 @@
+"""
+MIT License
+
+Copyright (c) 2018 Michael Schmidt
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import os
+import wave
+import shutil
+import tempfile
+import unittest
+import contextlib
+
+import numpy as np
+
+from features import CONTEXT_FRAMES, HOP_LENGTH, SAMPLE_RATE
+from features import extract_features, stream_features
+
+# small blocks so even short recordings cross several block boundaries
+BLOCK_FRAMES = 16
+
+
+class StreamFeaturesTest(unittest.TestCase):
+    """
+    stream_features() must reproduce extract_features(), which the
+    gender, age and dialect models were trained on.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.rng = np.random.RandomState(0)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, samples, sr=SAMPLE_RATE):
+        """
+        Write 16-bit PCM samples in [-1, 1] to a WAV file.
+
+        :name:          str()           File name inside the test directory
+        :samples:       np.ndarray      (frames,) or (frames, channels)
+        :sr:            int()           Sample rate
+        :returns:       str()           Path to the file
+        """
+
+        filename = os.path.join(self.directory, name)
+        samples = np.atleast_2d(samples.T).T
+
+        with contextlib.closing(wave.open(filename, 'w')) as data:
+            data.setnchannels(samples.shape[1])
+            data.setsampwidth(2)
+            data.setframerate(sr)
+            data.writeframes((samples * 32767).astype('<i2').tobytes())
+
+        return filename
+
+    def noise(self, length, channels=1):
+        """
+        :length:        int()           Number of frames
+        :channels:      int()           Number of channels
+        :returns:       np.ndarray      Uniform noise at half scale
+        """
+
+        return self.rng.uniform(-0.5, 0.5, (length, channels)).squeeze()
+
+    def assertEquivalent(self, filename):
+        """
+        Assert both extractors give the same 193 features.
+
+        :filename:      str()           A WAV file
+        :returns:       None
+        """
+
+        expected = extract_features(filename)
+        actual = stream_features(filename, block_frames=BLOCK_FRAMES)
+
+        self.assertEqual(actual.shape, (193,))
+        np.testing.assert_allclose(actual, expected, rtol=1e-5, atol=1e-5)
+
+    def test_noise(self):
+        self.assertEquivalent(self.write('noise.wav', self.noise(15 * SAMPLE_RATE)))
+
+    def test_tone_and_noise(self):
+        t = np.arange(10 * SAMPLE_RATE) / float(SAMPLE_RATE)
+        tone = 0.3 * np.sin(2 * np.pi * 220 * t) + 0.2 * self.noise(len(t))
+
+        self.assertEquivalent(self.write('tone.wav', tone))
+
+    def test_stereo_44100(self):
+        t = np.arange(5 * 44100) / 44100.
+        tone = 0.3 * np.sin(2 * np.pi * 220 * t)[:, np.newaxis] + 0.2 * self.noise(len(t), 2)
+
+        self.assertEquivalent(self.write('stereo.wav', tone, sr=44100))
+
+    def test_block_boundary(self):
+        # a block is emitted once its right-hand context is available
+        for blocks in (1, 3):
+            boundary = (blocks * BLOCK_FRAMES + CONTEXT_FRAMES) * HOP_LENGTH
+
+            for offset in (-HOP_LENGTH, -1, 0, 1, HOP_LENGTH):
+                name = 'boundary{}_{}.wav'.format(blocks, offset)
+                with self.subTest(blocks=blocks, offset=offset):
+                    self.assertEquivalent(self.write(name, self.noise(boundary + offset)))
+
+    def test_single_block(self):
+        # librosa.effects.harmonic() needs at least n_fft (2048) samples;
+        # this fits one block with no right-hand context
+        self.assertEquivalent(self.write('short.wav', self.noise(2 * 1024 + HOP_LENGTH)))
+
+
+if __name__ == '__main__':
+    unittest.main()